@@ -29,6 +29,8 @@ class DdbFile(EpcFile):
 
     def __init__(self, *args, **kwargs):
         self.asr = kwargs.pop('asr', True)
+        # Displacements of the current q-point, cleared when the data changes
+        self._cache = dict()
         super(DdbFile, self).__init__(*args, **kwargs)
 
 
@@ -40,6 +42,7 @@ class DdbFile(EpcFile):
             amu: [ntypat]
                 Atom masses for each atom type, in atomic mass units.
         """
+        self._cache.clear()
         self.amu = np.array(amu)
 
 
@@ -49,6 +52,8 @@ class DdbFile(EpcFile):
 
         super(DdbFile, self).read_nc(fname)
 
+        self._cache.clear()
+
         with nc.Dataset(fname, 'r') as root:
 
             self.natom = len(root.dimensions['number_of_atoms'])
@@ -65,7 +70,7 @@ class DdbFile(EpcFile):
             self.E2D = np.zeros((self.natom, self.ncart, self.natom, self.ncart), dtype=np.complex)
             self.E2D.real = root.variables['second_derivative_of_energy'][:,:,:,:,0]
             self.E2D.imag = root.variables['second_derivative_of_energy'][:,:,:,:,1]
-            self.E2D = np.einsum('aibj->bjai', self.E2D)  # Indicies are reversed when writing them from Fortran.
+            self.E2D = self.E2D.transpose(2,3,0,1)  # Indicies are reversed when writing them from Fortran.
 
             self.BECT = root.variables['born_effective_charge_tensor'][:self.ncart,:self.natom,:self.ncart]
 
@@ -75,6 +80,8 @@ class DdbFile(EpcFile):
     
         comm.Barrier()
 
+        self._cache.clear()
+
         if rank == 0:
             dim = np.array([self.natom, self.ncart, self.ntypat], dtype=np.int)
         else:
@@ -120,6 +127,7 @@ class DdbFile(EpcFile):
 
     @rprim.setter
     def rprim(self, value):
+        self._cache.clear()
         self._rprim = np.array(value)
         self.gprimd = np.linalg.inv(np.matrix(self._rprim))
 
@@ -248,6 +256,10 @@ class DdbFile(EpcFile):
 
         Returns: polvec[nmode,3,natom]
         """
+        key = ('polvec', noscale)
+        if key in self._cache:
+            self.polvec = self._cache[key]
+            return self.polvec
 
         # Minimal value for omega (Ha)
         omega_tolerance = 1e-5
@@ -275,6 +287,8 @@ class DdbFile(EpcFile):
                     for jdir in range(3):
                         self.polvec[imode,idir,iatom] += xi_at[jdir] * self.gprimd[jdir,idir]
 
+        self._cache[key] = self.polvec
+
         return self.polvec
     
 
@@ -283,6 +297,10 @@ class DdbFile(EpcFile):
         Compute the squared reduced displacements (scaled by phonon frequencies)
         for the Fan and the DDW terms.
         """
+        if 'displ_red2' in self._cache:
+            self.displ_red_FAN2, self.displ_red_DDW2 = self._cache['displ_red2']
+            return self._cache['displ_red2']
+
         # Minimal value for omega (Ha)
         omega_tolerance = 1e-5
 
@@ -338,6 +356,8 @@ class DdbFile(EpcFile):
 
         self.displ_red_FAN2 = displ_red_FAN2
         self.displ_red_DDW2 = displ_red_DDW2
+
+        self._cache['displ_red2'] = displ_red_FAN2, displ_red_DDW2
     
         return displ_red_FAN2, displ_red_DDW2
 
@@ -141,7 +141,7 @@ def symmetrize_fan_degen(fan_epc, degen):
                     ieig, jeig = degi[1], degj[1]
                     offdiag[ikpt][ieig][jeig] = 0
 
-    fan_epc_sym = N.einsum('ijkl,ijk->ijkl', fan_epc, offdiag)
+    fan_epc_sym = fan_epc * offdiag[:,:,:,None]
 
     return fan_epc_sym
   
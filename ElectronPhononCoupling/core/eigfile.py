@@ -132,7 +132,7 @@ class EigFile(EpcFile):
     
         return degen
 
-    def make_average(self, arr):
+    def make_average(self, arr, bands=slice(None)):
         """ 
         Average a quantity over degenerated states.
         Does not work with spin yet.
@@ -143,6 +143,11 @@ class EigFile(EpcFile):
         arr: numpy.ndarray(..., nkpt, nband)
             An array of any dimension, of which the two last indicies are
             the kpoint and the band.
+        bands:
+            Slice of the bands along the last dimension of arr.
+            All bands by default. Groups of degenerated states outside
+            of this window are skipped, and a group that is only partly
+            inside raises a ValueError.
     
         Returns
         -------
@@ -156,20 +161,34 @@ class EigFile(EpcFile):
             self.get_degen()
 
         nkpt, nband = arr.shape[-2:]
+
+        start, stop, step = bands.indices(self.nband)
     
         for ikpt in range(nkpt):
             for group in self.degen[ikpt]:
-                average = copy(arr[...,ikpt,group[0][1]])
-                for ispin, iband in group[1:]:
+
+                # Band indices relative to the window
+                ibands = [iband - start for ispin, iband in group]
+                inside = [0 <= iband < stop - start for iband in ibands]
+                if not any(inside):
+                    continue
+                elif not all(inside):
+                    raise ValueError(
+                        'The band window ({}, {}) splits a group of '
+                        'degenerate states at k-point {}: {}'.format(
+                        start, stop, ikpt, group))
+
+                average = copy(arr[...,ikpt,ibands[0]])
+                for iband in ibands[1:]:
                     average += arr[...,ikpt,iband]
     
                 average /= len(group)
-                for ispin, iband in group:
+                for iband in ibands:
                     arr[...,ikpt,iband] = average
     
         return arr
 
-    def symmetrize_fan_degen(self, fan_epc):
+    def symmetrize_fan_degen(self, fan_epc, bands=slice(None)):
         """
         Enforce coupling terms to be zero on the diagonal
         and in degenerate states subset.
@@ -178,6 +197,9 @@ class EigFile(EpcFile):
         ---------
         fan_epc: np.ndarray, shape=(nkpt,nband,nband,nmode)
             The coupling matrix V_ij V_ji
+        bands:
+            Slice of the bands along the first band dimension of fan_epc.
+            All bands by default.
     
         Returns
         -------
@@ -189,8 +211,8 @@ class EigFile(EpcFile):
 
         nkpt, nband, mband, nmode = fan_epc.shape
      
-        offdiag = np.zeros((nkpt, nband, nband))
-        offdiag[:] =  np.ones((nband, nband)) - np.identity(nband)
+        offdiag = np.zeros((nkpt, mband, mband))
+        offdiag[:] =  np.ones((mband, mband)) - np.identity(mband)
     
         for ikpt in range(nkpt):
             for group in self.degen[ikpt]:
@@ -199,7 +221,7 @@ class EigFile(EpcFile):
                         ieig, jeig = degi[1], degj[1]
                         offdiag[ikpt][ieig][jeig] = 0
     
-        fan_epc_sym = np.einsum('ijkl,ijk->ijkl', fan_epc, offdiag)
+        fan_epc_sym = fan_epc * offdiag[:,bands,:,None]
     
         return fan_epc_sym
 
@@ -40,7 +40,7 @@ class Eigr2dFile(EpcFile):
             # number_of_kpoints, product_mband_nsppol, cplex
             EIG2Dtmp = root.variables['second_derivative_eigenenergies'][:,:,:,:,:,:,:]
 
-            EIG2Dtmp2 = np.einsum('ijklmno->mnlkjio', EIG2Dtmp)
+            EIG2Dtmp2 = np.asarray(EIG2Dtmp).transpose(4,5,3,2,1,0,6)
 
             self.EIG2D.real[...] = EIG2Dtmp2[...,0]
             self.EIG2D.imag[...] = EIG2Dtmp2[...,1]
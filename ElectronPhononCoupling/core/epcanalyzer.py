@@ -87,6 +87,8 @@ class EpcAnalyzer(object):
                  nband_se = None,
                  iband_se = 0,
 
+                 precision = 'double',
+
                  # File names
                  rootname='epc.out',
                  eigk_fname='',
@@ -116,6 +118,10 @@ class EpcAnalyzer(object):
         if len(wtq) != nqpt:
             raise Exception("Must provide nqpt weights in the 'wtq' list.")
 
+        if precision not in ('single', 'double'):
+            raise ValueError("precision must be 'single' or 'double', "
+                             "got {!r}".format(precision))
+
         # Set basic quantities
         self.nqpt = nqpt
         self.set_weights(wtq)
@@ -179,6 +185,7 @@ class EpcAnalyzer(object):
             smearing_below = smearing_below,
             nband_se = nband_se,
             iband_se = iband_se,
+            precision = precision,
             )
 
         # Read the first DDB and check that it is Gamma
@@ -463,20 +470,15 @@ class EpcAnalyzer(object):
         partial_sum = self.sum_qpt_function_me(func_name, fine=fine,
                                                *args, **kwargs)
 
-        if i_am_master:
-            total = partial_sum
-            #active_ranks = self.get_active_ranks()
-            active_ranks = self.get_active_ranks(fine)
-            if len(active_ranks) > 1:
-                for irank in active_ranks[1:]:
-                    partial_sum = comm.recv(source=irank, tag=irank)
-                    total += partial_sum
+        # The partial sums are combined along a tree of workers
+        # rather than being received one after the other by master.
+        # Inactive workers do not contribute to the sum.
+        if partial_sum is None:
+            partial_sum = 0
 
-        elif self.active_worker:
-            comm.send(partial_sum, dest=0, tag=rank)
-            return
+        total = comm.reduce(partial_sum, op=MPI.SUM, root=0)
 
-        else:
+        if not i_am_master:
             return
 
         # Now I could broadcast the total result to all workers
@@ -583,7 +585,7 @@ class EpcAnalyzer(object):
             self.print_qpt()
 
         q0 = np.array(getattr(self.qptanalyzer, func_name)(*args, **kwargs))
-        total = np.zeros([nqpt_me] + list(q0.shape), dtype=q0.dtype)
+        total = np.empty([nqpt_me] + list(q0.shape), dtype=q0.dtype)
 
         total[0,...] = q0[...]
 
@@ -646,8 +648,8 @@ class EpcAnalyzer(object):
 
         nqpt_me = len(self.my_iqpts)
 
-        qred = np.zeros((nqpt_me, 3), dtype=np.float)
-        omega = np.zeros((nqpt_me, 3 * self.natom), dtype=np.float)
+        qred = np.empty((nqpt_me, 3), dtype=np.float)
+        omega = np.empty((nqpt_me, 3 * self.natom), dtype=np.float)
 
         for i, iqpt in enumerate(self.my_iqpts):
 
@@ -908,18 +910,12 @@ class EpcAnalyzer(object):
             A'_kn(omega) = A_kn(omega + E^0_kn)
 
         """
-        nomegase = self.nomegase
-        nkpt = self.nkpt
-        nband = self.nband
-
-        self.spectral_function = np.zeros((nomegase, nkpt, nband), dtype=float)
+        # nkpt, nband, nomegase
+        omega = np.asarray(self.omegase)[None,None,:]
 
-        omega = np.einsum('kn,l->knl', np.ones((nkpt, nband)), self.omegase)
-
-        self.spectral_function = (
-            (1 / np.pi) * np.abs(self.self_energy.imag) /
-            ((omega - self.self_energy.real) ** 2 + self.self_energy.imag ** 2)
-            )
+        # A = |Im G| / pi with G = 1 / (omega - sigma)
+        green = np.reciprocal(omega - self.self_energy)
+        self.spectral_function = (1 / np.pi) * np.abs(green.imag)
 
     @master_only
     def compute_td_spectral_function(self):
@@ -934,22 +930,12 @@ class EpcAnalyzer(object):
             A'_kn(omega) = A_kn(omega + E^0_kn)
 
         """
-        nomegase = self.nomegase
-        nkpt = self.nkpt
-        nband = self.nband
-        ntemp = self.ntemp
+        # nkpt, nband, nomegase, ntemp
+        omega = np.asarray(self.omegase)[None,None,:,None]
 
-        self.spectral_function_T = np.zeros((nomegase, ntemp, nkpt, nband),
-                                            dtype=float)
-
-        omega = np.einsum('ijt,l->ijlt',
-                          np.ones((nkpt, nband, ntemp)), self.omegase)
-
-        self.spectral_function_T = (
-            (1 / np.pi) * np.abs(self.self_energy_T.imag) /
-            ((omega - self.self_energy_T.real) ** 2
-             + self.self_energy_T.imag ** 2)
-            )
+        # A = |Im G| / pi with G = 1 / (omega - sigma)
+        green = np.reciprocal(omega - self.self_energy_T)
+        self.spectral_function_T = (1 / np.pi) * np.abs(green.imag)
 
     def compute_zp_self_energy_double_grid(self):
         """
@@ -42,7 +42,7 @@ class FanFile(EpcFile):
             # number_of_kpoints, product_mband_nsppol*2
             FANtmp = root.variables['second_derivative_eigenenergies_actif'][:,:,:,:,:,:,:]
             #FANtmp2 = zeros((self.nkpt,2*self.nband,3,self.natom,3,self.natom,self.nband))
-            FANtmp2 = np.einsum('ijklmno->nomlkji', FANtmp)
+            FANtmp2 = np.asarray(FANtmp).transpose(5,6,4,3,2,1,0)
             self.FAN.real[...] = FANtmp2[:, ::2, ...]
             self.FAN.imag[...] = FANtmp2[:, 1::2, ...]
             del FANtmp, FANtmp2
@@ -6,7 +6,6 @@ __author__ = "Gabriel Antonius"
 import os
 
 import numpy as np
-from numpy import zeros, einsum
 import netCDF4 as nc
 
 from .ddbfile import DdbFile
@@ -49,7 +48,7 @@ class GkkFile(EpcFile):
 
             # nband, natom, ncart, nkpt, product_mband_nsppol*2 
             GKKtmp = root.variables['second_derivative_eigenenergies_actif'][:,:,:,:,:]
-            GKKtmp2 = np.einsum('ijkno->nokji', GKKtmp)
+            GKKtmp2 = np.asarray(GKKtmp).transpose(3,4,2,1,0)
             self.GKK = np.zeros((self.nkpt, self.nsppol*self.nband, 3, self.natom, self.nband), dtype=np.complex)
             self.GKK.real[...] = GKKtmp2[:, ::2, ...]
             self.GKK.imag[...] = GKKtmp2[:, 1::2, ...]
@@ -86,7 +85,7 @@ class GkkFile(EpcFile):
             GKKtmp2 = np.zeros((self.nkpt, 2*self.nsppol*self.nband, 3, self.natom, self.nband), dtype=np.float64)
             GKKtmp2[:, ::2, ...]  = GKKtmp3.real[...]
             GKKtmp2[:, 1::2, ...] = GKKtmp3.imag[...]
-            GKKtmp = np.einsum('nokji->ijkno', GKKtmp2)
+            GKKtmp = GKKtmp2.transpose(4,3,2,0,1)
 
             data[...] = GKKtmp
 
@@ -100,12 +99,11 @@ class GkkFile(EpcFile):
 
         # No spin polarization at the moment.
 
-        gkk2 = zeros((self.nkpt, self.nband, 3, self.natom, 3, self.natom,
-                      self.nband), dtype=np.complex)
+        gkk = self.GKK[:,0,...]
 
+        # Outer product, equivalent to einsum('ijklm,ijnom->ijklnom')
         # nkpt,nband,3,natom,3,natom,nband
-        gkk2 = einsum('ijklm,ijnom->ijklnom', self.GKK[:,0,...],
-                                              self.GKK[:,0,...].conjugate())
+        gkk2 = gkk[:,:,:,:,None,None,:] * gkk.conjugate()[:,:,None,None,:,:,:]
 
         return gkk2
 
@@ -118,12 +116,11 @@ class GkkFile(EpcFile):
 
         # No spin polarization at the moment.
 
-        gkk2 = zeros((self.nband, 3, self.natom, 3, self.natom,
-                      self.nband), dtype=np.complex)
+        gkk = self.GKK[ikpt,0,...]
 
-        # nkpt,nband,3,natom,3,natom,nband
-        gkk2 = einsum('jklm,jnom->jklnom', self.GKK[ikpt,0,...],
-                                           self.GKK[ikpt,0,...].conjugate())
+        # Outer product, equivalent to einsum('jklm,jnom->jklnom')
+        # nband,3,natom,3,natom,nband
+        gkk2 = gkk[:,:,:,None,None,:] * gkk.conjugate()[:,None,None,:,:,:]
 
         return gkk2
 
@@ -148,11 +145,11 @@ class GkkFile(EpcFile):
         """
         assert ddb.nmode == 3 * self.natom
 
-        self.GKK_mode = np.zeros((self.nkpt, self.nband, self.nband, ddb.nmode), dtype=np.complex)
-
         polvec = ddb.get_reduced_displ(noscale=noscale)
 
-        self.GKK_mode = np.einsum('kniam,oia->knmo', self.GKK[:,0,...], polvec)
+        # Equivalent to einsum('kniam,oia->knmo', GKK, polvec)
+        self.GKK_mode = np.tensordot(self.GKK[:,0,...], polvec,
+                                     axes=([2,3], [1,2]))
 
         return self.GKK_mode
 
@@ -197,7 +194,7 @@ class GkkFile(EpcFile):
                                 GKK_cart[icart+3*iat])
         return self.GKK
 
-    def get_gkk2_DW_mode(self, ddb):
+    def get_gkk2_DW_mode(self, ddb, bands=slice(None)):
         """
         Compute the squared gkk matrix elements for the Debye-Waller
         self-energy.
@@ -213,6 +210,9 @@ class GkkFile(EpcFile):
         ---------
         ddb:
             DdbFile object.
+        bands:
+            Slice of the bands at k for which the elements are computed.
+            All bands by default.
 
         Returns
         -------
@@ -222,21 +222,30 @@ class GkkFile(EpcFile):
         assert ddb.nmode == 3 * self.natom
 
 
-        self.GKK2_DW_mode = np.zeros((self.nkpt, self.nband, self.nband, ddb.nmode), dtype=np.complex)
-
         polvec = ddb.get_reduced_displ()
 
-        g_r = np.einsum('kniam->knim', self.GKK[:,0,...])
+        # nkpt, nband, 3, natom, nband
+        gkk = self.GKK[:,0,bands,...]
 
-        for imode in range(ddb.nmode):
+        # nkpt, nband, 3, nband
+        g_r = gkk.sum(axis=3)
+
+        # For each mode, with g_l[k,n,a,m] = sum_i GKK[k,n,i,a,m] polvec[i,a],
+        #   g2[k,n,m] = sum_a conj(g_l[k,n,a,m]) sum_i polvec[i,a] g_r[k,n,i,m]
+        # All modes are obtained at once by looping over the atoms.
+        g2 = np.zeros(g_r.shape[:2] + (self.nband, ddb.nmode),
+                      dtype=np.complex)
 
-            g_l1 = np.einsum('kniam,ia->knam', self.GKK[:,0,...], polvec[imode,...]) 
+        for iat in range(self.natom):
 
-            g_l2 = np.einsum('knam,ia->knim', np.conj(g_l1), polvec[imode,...]) 
+            # nkpt, nband, nband, nmode
+            g_l = np.tensordot(gkk[:,:,:,iat,:], polvec[:,:,iat],
+                               axes=([2], [1]))
+            g_ri = np.tensordot(g_r, polvec[:,:,iat], axes=([2], [1]))
 
-            g2 = np.einsum('knim,knim->knm', g_l2, g_r)
+            g2 += np.conj(g_l) * g_ri
 
-            self.GKK2_DW_mode[...,imode] = np.real(g2)
+        self.GKK2_DW_mode = np.asarray(g2.real, dtype=np.complex)
 
         return self.GKK2_DW_mode
 
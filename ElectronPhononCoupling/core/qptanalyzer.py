@@ -1,7 +1,8 @@
 from __future__ import print_function
+import warnings
 
 import numpy as np
-from numpy import zeros, ones, einsum
+from numpy import zeros, ones
 
 from .constants import tol6, tol8, tol12, Ha2eV, kb_HaK
 
@@ -17,6 +18,12 @@ class QptAnalyzer(object):
 
     _nband_se = None
 
+    # Maximum number of elements in the temporary arrays
+    # built for a block of k-points in the active space
+    max_block_size = 2**24
+    _omegase = zeros(0)
+    _temperatures = zeros(0)
+
     def __init__(self,
                  ddb_fname=None,
                  eigq_fname=None,
@@ -41,6 +48,7 @@ class QptAnalyzer(object):
                  smearing_below = 0.00367,
                  nband_se = None,  # Number of bands for self-energy
                  iband_se = 0,  # Starting bands index for self-energy
+                 precision = 'double',  # Precision of the largest arrays
                  ):
 
         # Files
@@ -57,8 +65,8 @@ class QptAnalyzer(object):
 
         self.wtq = wtq
         self.smearing = smearing
-        self.omegase = omegase if omegase else list()
-        self.temperatures = temperatures if temperatures else list()
+        self.omegase = omegase if omegase is not None else list()
+        self.temperatures = temperatures if temperatures is not None else list()
         self.mu = mu
         self.amu = amu
 
@@ -70,6 +78,14 @@ class QptAnalyzer(object):
         self.nband_se = nband_se
         self.iband_se = iband_se
 
+        if precision not in ('single', 'double'):
+            raise ValueError("precision must be 'single' or 'double', "
+                             "got {!r}".format(precision))
+        self.precision = precision
+
+        # Quantities that depend only on the current q-point
+        self._cache = dict()
+
     @property
     def nkpt(self):
         if self.eigr2d.fname:
@@ -131,13 +147,37 @@ class QptAnalyzer(object):
     def omega(self):
         return self.ddb.omega
 
+    @property
+    def omegase(self):
+        return self._omegase
+
+    @omegase.setter
+    def omegase(self, value):
+        self._omegase = np.asarray(value, dtype=float).reshape(-1)
+
+    @property
+    def temperatures(self):
+        return self._temperatures
+
+    @temperatures.setter
+    def temperatures(self, value):
+        self._temperatures = np.asarray(value, dtype=float).reshape(-1)
+
     @property
     def nomegase(self):
-        return len(self.omegase)
+        return self.omegase.size
 
     @property
     def ntemp(self):
-        return len(self.temperatures)
+        return self.temperatures.size
+
+    @property
+    def real_dtype(self):
+        return np.float32 if self.precision == 'single' else np.float64
+
+    @property
+    def complex_dtype(self):
+        return np.complex64 if self.precision == 'single' else np.complex128
 
     @property
     def use_gkk(self):
@@ -149,11 +189,17 @@ class QptAnalyzer(object):
 
     def read_nonzero_files(self):
         """Read all nc files that are not specifically related to q=0."""
+        self._cache.clear()
+
         for f in (self.ddb, self.eigq, self.eigr2d, self.eigi2d,
                   self.fan, self.gkk):
             if f.fname:
                 f.read_nc()
 
+        for f in (self.eigr2d, self.eigi2d):
+            if f.fname:
+                f.EIG2D = self._astype_precision(f.EIG2D)
+
         if self.amu is not None:
             self.ddb.set_amu(self.amu)
 
@@ -161,6 +207,7 @@ class QptAnalyzer(object):
 
     def read_ddb(self):
         """Read the ddb and diagonalize the matrix, setting omega."""
+        self._cache.clear()
         self.ddb.read_nc()
         if self.amu is not None:
             self.ddb.set_amu(self.amu)
@@ -168,12 +215,14 @@ class QptAnalyzer(object):
 
     def read_zero_files(self):
         """Read all nc files that are related to q=0."""
+        self._cache.clear()
         for f in (self.eig0, self.eigr2d0, self.fan0, self.gkk0):
             if f.fname:
                 f.read_nc()
 
     def broadcast_zero_files(self):
         """Broadcast the data related to q=0 from master to all workers."""
+        self._cache.clear()
 
         if self.eig0.fname:
             self.eig0.broadcast()
@@ -181,6 +230,8 @@ class QptAnalyzer(object):
 
         if self.eigr2d0.fname:
             self.eigr2d0.broadcast()
+            # Cast only after the broadcast, which expects double precision
+            self.eigr2d0.EIG2D = self._astype_precision(self.eigr2d0.EIG2D)
 
         if self.fan0.fname:
             self.fan0.broadcast()
@@ -188,6 +239,42 @@ class QptAnalyzer(object):
         if self.gkk0.fname:
             self.gkk0.broadcast()
 
+    def get_bose(self, temperatures):
+        """
+        Get the Bose-Einstein occupations of the current q-point.
+
+        Returns: bose[nmode, ntemp]
+        """
+        key = ('bose', tuple(temperatures))
+        if key not in self._cache:
+            self._cache[key] = self.ddb.get_bose(temperatures)
+        return self._cache[key]
+
+    def get_eig_real(self):
+        """
+        Get the real part of the eigenvalues at k and at k+q
+        for the first spin, as plain arrays.
+        The result is kept for the current q-point.
+
+        Returns: eig0[nkpt, nband], eigq[nkpt, nband]
+        """
+        if 'eig_real' not in self._cache:
+            self._cache['eig_real'] = (
+                np.asarray(self.eig0.EIG[0,:,:].real),
+                np.asarray(self.eigq.EIG[0,:,:].real),
+                )
+        return self._cache['eig_real']
+
+    def get_kpt_blocks(self, size_per_kpt):
+        """
+        Iterate over slices of k-points, such that an array holding
+        size_per_kpt elements per k-point does not exceed max_block_size.
+        """
+        nkpt = self.nkpt
+        nkpt_block = max(1, self.max_block_size // max(size_per_kpt, 1))
+        for ikpt in range(0, nkpt, nkpt_block):
+            yield slice(ikpt, min(ikpt + nkpt_block, nkpt))
+
     def get_occ_kq_nospin(self):
         """
         Get the occupations, being either 0 or 1, regardless of spinor.
@@ -213,24 +300,22 @@ class QptAnalyzer(object):
         occ0 = self.get_occ_kq_nospin()
         eig = self.eigq.EIG[0,0,:]
 
-        E_last = eig[0]
-        for f, E in zip(occ0, eig):
-            if f < 0.5:
-                break
-            E_last = E
+        # Index of the last band before the first unoccupied one
+        empty = np.asarray(occ0 < 0.5)
+        ilast = np.argmax(empty) - 1 if empty.any() else len(eig) - 1
 
-        return E_last
+        return eig[max(ilast, 0)]
 
     def get_min_cond(self):
         """Get the minimum conduction band energy."""
         occ0 = self.get_occ_kq_nospin()
         eig = self.eigq.EIG[0,0,:]
 
-        for f, E in zip(occ0, eig):
-            if f <= 0.5:
-                break
+        # Index of the first band that is not occupied
+        empty = np.asarray(occ0 <= 0.5)
+        ifirst = np.argmax(empty) if empty.any() else len(eig) - 1
 
-        return E
+        return eig[ifirst]
 
     def find_fermi_level(self):
         """
@@ -253,9 +338,8 @@ class QptAnalyzer(object):
         # nkpt, nband
         signs = (2 * occ0 - 1)
 
-        nomegase = len(omega_se)
-        values = np.zeros(nomegase, dtype=float)
-        #abso = np.abs(omega_se)
+        omega_se = np.asarray(omega_se, dtype=float)
+        abso = np.abs(omega_se)
 
         if self.double_smearing:
 
@@ -264,24 +348,27 @@ class QptAnalyzer(object):
             eta3 = self.smearing_above
             w = self.smearing_width
 
-            for i, o in enumerate(omega_se):
-
-                if o < -w:
-                    values[i] = eta1
-                elif o <= 0.:
-                    values[i] = eta2 + (eta1-eta2) * abs(o) / w
-                elif o < w:
-                    values[i] = eta2 + (eta3-eta2) * abs(o) / w
-                else:
-                    values[i] = eta3
+            values = np.select(
+                [omega_se < -w, omega_se <= 0., omega_se < w],
+                [eta1,
+                 eta2 + (eta1-eta2) * abso / w,
+                 eta2 + (eta3-eta2) * abso / w],
+                default=eta3)
 
         else:
-            values[:] = self.smearing
+            values = np.full(omega_se.shape, self.smearing, dtype=float)
 
-        eta = einsum('kn,l->knl', signs, values) * 1j 
+        # nkpt, nband, nomegase
+        eta = signs[:,:,None] * values[None,None,:] * 1j
 
         return eta
 
+    def _astype_precision(self, arr):
+        """Cast an array to the working precision, keeping it real or complex."""
+        if np.iscomplexobj(arr):
+            return np.asarray(arr, dtype=self.complex_dtype)
+        return np.asarray(arr, dtype=self.real_dtype)
+
     @staticmethod
     def get_se_indices(mode=False, temperature=False, omega=False):
         """Get the indices string corresponding to the self-energy dimensions"""
@@ -328,9 +415,116 @@ class QptAnalyzer(object):
 
             final_indices = shape
 
-        summation = initial_indices + '->' + final_indices
+        # The input may be a broadcasted view, so a new array is returned
+        return QptAnalyzer.sum_transpose(arr, initial_indices, final_indices,
+                                         copy=True)
+
+    @staticmethod
+    def sum_transpose(arr, initial_indices, final_indices, copy=False):
+        """
+        Sum an array over the dimensions labeled by initial_indices
+        which are not in final_indices, and order the remaining ones
+        as in final_indices. This is einsum(initial_indices + '->'
+        + final_indices, arr) for a single operand, without the parsing.
+
+        Unless copy=True, a view is returned when no dimension is summed.
+        """
+        # Sum over the dimensions that are not kept
+        axes = tuple(i for i, c in enumerate(initial_indices)
+                     if c not in final_indices)
+        if axes or copy:
+            arr = arr.sum(axis=axes)
+
+        # Reorder the remaining dimensions
+        remaining = [c for c in initial_indices if c in final_indices]
+        order = [remaining.index(c) for c in final_indices]
+
+        return arr.transpose(order)
+
+    @staticmethod
+    def multiply_tdep(arr, tdep, mode=False):
+        """
+        Multiply an array by its temperature dependence factor.
+
+        arr: arr[nmode, nkpt, nband]
+        tdep: tdep[nmode, ntemp]
+        mode:
+            Keep the first dimension.
+            Otherwise, it is summed over in the same operation.
+
+        Returns: arr[nmode, ntemp, nkpt, nband]
+                 or arr[1, ntemp, nkpt, nband] in case mode=False
+        """
+        if mode:
+            return arr[:,None,:,:] * tdep[:,:,None,None]
+        return np.tensordot(tdep, arr, axes=([0],[0]))[None,...]
 
-        return einsum(summation, arr)
+    @staticmethod
+    def contract_eig2d_displ(eig2d, displ_red2):
+        """
+        Contract the second-order eigenvalue derivatives
+        with the squared reduced displacements.
+
+        eig2d: eig2d[nkpt, nband, 3, natom, 3, natom]
+        displ_red2: displ_red2[nmode, natom, natom, 3, 3]
+
+        Returns: arr[nkpt, nband, nmode]
+        """
+        # Equivalent to einsum('knabij,objai->kno', eig2d, displ_red2)
+        return np.tensordot(eig2d, displ_red2, axes=([2,3,4,5], [3,1,4,2]))
+
+    @staticmethod
+    def contract_fan_numerators(g2, num, weights, mode=True):
+        """
+        Contract the squared matrix elements and the occupation numerators
+        with the emission/absorption weights, summing over the bands m
+        at k+q and over both terms.
+
+        g2: g2[nkpt, nband, mband, nmode]
+        num: num[2, nkpt, mband, nmode, ntemp]
+        weights: weights[2, nkpt, nband, mband, nomegase, nmode]
+        mode:
+            Keep the mode dimension. Otherwise, it is summed over
+            and has length 1 in the returned array.
+
+        Returns: arr[nmode, ntemp, nomegase, nkpt, nband]
+        """
+        # Equivalent to einsum('knmo,skmot,sknmlo->otlkn', g2, num, weights)
+        # but written as a batched matrix product over (nkpt, nmode),
+        # or over nkpt only in case mode=False,
+        # so that the summation over (2, mband[, nmode]) is done by BLAS.
+        nkpt, nband, mband, nmode = g2.shape
+        ntemp = num.shape[-1]
+        nomegase = weights.shape[4]
+
+        if mode:
+            batch = (nkpt, nmode)
+            nsum = 2 * mband
+            num_axes = (1,3,4,0,2)
+            weights_axes = (1,5,0,3,2,4)
+        else:
+            batch = (nkpt,)
+            nsum = 2 * mband * nmode
+            num_axes = (1,4,0,2,3)
+            weights_axes = (1,0,3,5,2,4)
+
+        # batch, ntemp, nsum
+        a = num.transpose(num_axes).reshape(batch + (ntemp, nsum))
+
+        # The product with g2 is written directly in the layout
+        # of the matrix product, so that no other copy is made.
+        w = weights.transpose(weights_axes)
+        b = np.empty(w.shape, dtype=np.result_type(weights, g2))
+        np.multiply(w, g2[None,:,:,:,None,:].transpose(weights_axes), out=b)
+
+        # batch, nsum, nband*nomegase
+        b = b.reshape(batch + (nsum, nband*nomegase))
+
+        arr = np.matmul(a, b).reshape(batch + (ntemp, nband, nomegase))
+
+        if mode:
+            return arr.transpose(1,2,4,0,3)
+        return arr.transpose(1,3,0,2)[None,...]
 
     def get_fan_ddw_sternheimer(self,
         mode=False, omega=False, temperature=False, shape=None):
@@ -368,27 +562,33 @@ class QptAnalyzer(object):
         ntemp = self.ntemp
 
         # Get reduced displacement (scaled with frequency)
-        displ_red_FAN2, displ_red_DDW2 = self.ddb.get_reduced_displ_squared()
+        displ_red_FAN2, displ_red_DDW2 = map(
+            self._astype_precision, self.ddb.get_reduced_displ_squared())
     
         # FIXME this will not work for nsppol=2
         # nmode, nkpt, nband
-        fan = einsum('knabij,objai->okn', self.eigr2d.EIG2D[:,ib:fb,...], displ_red_FAN2)
-        ddw = einsum('knabij,objai->okn', self.eigr2d0.EIG2D[:,ib:fb,...], displ_red_DDW2)
+        fan = np.moveaxis(self.contract_eig2d_displ(
+            self.eigr2d.EIG2D[:,ib:fb,...], displ_red_FAN2), 2, 0)
+        ddw = np.moveaxis(self.contract_eig2d_displ(
+            self.eigr2d0.EIG2D[:,ib:fb,...], displ_red_DDW2), 2, 0)
+        fan = np.asarray(fan, dtype=complex)
+        ddw = np.asarray(ddw, dtype=complex)
 
         # Temperature dependence factor
-        n_B = self.ddb.get_bose(self.temperatures)
+        n_B = self.get_bose(self.temperatures)
         tdep = 2 * n_B + 1 if temperature else ones((nmode,1))
 
-        # Omega dependence factor
-        odep = ones(nomegase) if omega else ones(1)
+        # Omega dependence
+        nomega = nomegase if omega else 1
 
         # nmode, ntemp, nkpt, nband
-        fan = einsum('okn,ot->otkn', fan, tdep)
-        ddw = einsum('okn,ot->otkn', ddw, tdep)
+        fan = self.multiply_tdep(fan, tdep, mode=mode)
+        ddw = self.multiply_tdep(ddw, tdep, mode=mode)
 
         # nmode, ntemp, nomega, nkpt, nband
-        fan = einsum('otkn,l->otlkn', fan, odep)
-        ddw = einsum('otkn,l->otlkn', ddw, odep)
+        shape5 = fan.shape[:2] + (nomega,) + fan.shape[2:]
+        fan = np.broadcast_to(fan[:,:,None,:,:], shape5)
+        ddw = np.broadcast_to(ddw[:,:,None,:,:], shape5)
 
         # Reduce the arrays
         fan = self.reduce_array(fan, mode=mode, temperature=temperature,
@@ -400,6 +600,7 @@ class QptAnalyzer(object):
     def get_fan_ddw_gkk2_active(self):
         """
         Compute the squared gkk elements for the fan ddw terms.
+        The result is kept for the current q-point.
 
         Returns:
             fan[nkpt, nband, nband, nmode]
@@ -410,41 +611,88 @@ class QptAnalyzer(object):
             raise Exception('You should provide GKK files or FAN files '
                             'to compute active space contribution.')
 
+        nband = self.nband_se
+        ib = self.iband_se
+        fb = ib + nband
+
+        key = ('gkk2_active', ib, fb)
+        if key in self._cache:
+            return self._cache[key]
+
         if self.use_gkk:
 
             #gkk2 = self.gkk.get_gkk_squared()
             #gkk02 = self.gkk0.get_gkk_squared()
 
-            fan = np.abs(self.gkk.get_gkk_mode(self.ddb)) ** 2
-            ddw = self.gkk0.get_gkk2_DW_mode(self.ddb)
+            # Only the bands of the self-energy window are kept
+            fan = np.abs(self.gkk.get_gkk_mode(self.ddb)[:,ib:fb,...])
+            np.square(fan, out=fan)
+            ddw = self.gkk0.get_gkk2_DW_mode(self.ddb, bands=slice(ib, fb))
 
         else:
             # Get reduced displacement (scaled with frequency)
-            displ_red_FAN2, displ_red_DDW2 = self.ddb.get_reduced_displ_squared()
+            displ_red_FAN2, displ_red_DDW2 = (
+                self.ddb.get_reduced_displ_squared())
 
-            gkk2 = self.fan.FAN
-            gkk02 = self.fan0.FAN
+            # Only the bands of the self-energy window are contracted
+            gkk2 = self.fan.FAN[:,ib:fb,...]
+            gkk02 = self.fan0.FAN[:,ib:fb,...]
 
+            # Equivalent to einsum('kniajbm,oabij->knmo', gkk2, displ_red2)
+            # as a single matrix product over (i, a, j, b).
             # nkpt, nband, nband, nmode
-            fan = einsum('kniajbm,oabij->knmo', gkk2, displ_red_FAN2)
-            ddw = einsum('kniajbm,oabij->knmo', gkk02, displ_red_DDW2)
+            fan = np.tensordot(gkk2, displ_red_FAN2,
+                               axes=([2,3,4,5], [3,1,4,2]))
+            ddw = np.tensordot(gkk02, displ_red_DDW2,
+                               axes=([2,3,4,5], [3,1,4,2]))
+
+        # Enforce the diagonal coupling terms to be zero at Gamma
+        ddw = self.eig0.symmetrize_fan_degen(ddw, bands=slice(ib, fb))
+        if self.is_gamma:
+            fan = self.eig0.symmetrize_fan_degen(fan, bands=slice(ib, fb))
+
+        self._cache[key] = fan, ddw
+      
+        return fan, ddw
+    
+    def get_inv_delta_E_ddw(self):
+        """
+        Compute the inverse of the eigenvalue differences at q=0
+        entering the active-space Debye-Waller term.
+        The result is kept for the current q-point.
 
+        Returns: inv_delta_E_ddw[nkpt, nband_se, nband]
+        """
         nband = self.nband_se
         ib = self.iband_se
         fb = ib + nband
 
-        fan = fan[:,ib:fb,...]
-        ddw = ddw[:,ib:fb,...]
+        key = ('inv_delta_E_ddw', ib, fb, tuple(np.ravel(self.mu)))
+        if key in self._cache:
+            return self._cache[key]
 
-        # Enforce the diagonal coupling terms to be zero at Gamma
-        ddw = self.eig0.symmetrize_fan_degen(ddw)
-        if self.is_gamma:
-            fan = self.eig0.symmetrize_fan_degen(fan)
-      
-        return fan, ddw
+        # Here we hard-code a large smearing for the DDW term
+        smearing_ddw = 0.1 / Ha2eV
+
+        # nkpt, nband
+        occ0 = self.eig0.get_fermi_function_T0(self.mu)[0,:,ib:fb]
     
+        # The bands n are those of the self-energy, the bands m are all bands
+        # nkpt, nband
+        eig0 = self.get_eig_real()[0]
+
+        # nkpt, nband_se, nband
+        delta_E_ddw = (eig0[:,ib:fb,None] - eig0[:,None,:]
+                     - (2*occ0-1)[:,:,None] * smearing_ddw * 1j)
+
+        inv_delta_E_ddw = 1.0 / delta_E_ddw
+
+        self._cache[key] = inv_delta_E_ddw
+
+        return inv_delta_E_ddw
+
     def get_fan_ddw_active(self, mode=False, omega=False, temperature=False,
-                           dynamical=True, shape=None):
+                           dynamical=True, shape=None, real=False):
         """
         Compute the fan and ddw contributions to the self-energy
         from the active space, that is, the the lower bands.
@@ -466,6 +714,8 @@ class QptAnalyzer(object):
 
         The Debye-Waller term does not actually depends on omega,
         but this dimension is kept anyway.
+
+        In case real=True, only the real part of the Fan term is computed.
         """
 
         nkpt = self.nkpt
@@ -481,7 +731,7 @@ class QptAnalyzer(object):
 
             # Bose-Enstein occupation number
             # nmode, ntemp
-            n_B = self.ddb.get_bose(temperatures)
+            n_B = self.get_bose(temperatures)
 
         else:
             ntemp = 1
@@ -514,33 +764,26 @@ class QptAnalyzer(object):
         # DDW term
         # --------
 
-        # Here we hard-code a large smearing for the DDW term
-        smearing_ddw = 0.1 / Ha2eV
-
-        # nkpt, nband
-        occ0 = self.eig0.get_fermi_function_T0(self.mu)[0,:,ib:fb]
-    
         # nkpt, nband, nband
-        delta_E_ddw = (einsum('kn,m->knm', self.eig0.EIG[0,:,ib:fb].real, ones(nband))
-                     - einsum('kn,m->kmn', self.eig0.EIG[0,:,ib:fb].real, ones(nband))
-                     - einsum('m,kn->knm', ones(nband), (2*occ0-1)) * smearing_ddw * 1j)
+        inv_delta_E_ddw = self.get_inv_delta_E_ddw()
+
+        # Sum over m as a batched vector-matrix product.
+        # nkpt, nband, 1, nmode
+        ddw = np.matmul(inv_delta_E_ddw[:,:,None,:], ddw_g2)
 
         # nmode, nkpt, nband
-        ddw = einsum('knmo,knm->okn', ddw_g2, 1.0 / delta_E_ddw)
+        ddw = ddw[:,:,0,:].transpose(2,0,1)
 
         # nmode, ntemp
         tdep = 2 * n_B + 1
 
-        # FIXME This is not optimal: The mode indices will be summed
-        #       so there is no need to create an array this big.
-        #       in case omega=True and mode=False
+        # The mode indices are summed right away in case mode=False
         # nmode, ntemp, nkpt, nband
-        ddw = einsum('okn,ot->otkn', ddw, tdep)
+        ddw = self.multiply_tdep(ddw, tdep, mode=mode)
 
-        odep = ones(nomegase) if omega else ones(0)
-
-        # ntemp, nomega, nkpt, nband
-        ddw = einsum('otkn,l->otlkn', ddw, ones(nomegase))
+        # nmode, ntemp, nomega, nkpt, nband
+        ddw = np.broadcast_to(ddw[:,:,None,:,:],
+                              ddw.shape[:2] + (nomegase,) + ddw.shape[2:])
 
         # Reduce the arrays
         ddw = self.reduce_array(ddw, mode=mode,
@@ -551,68 +794,69 @@ class QptAnalyzer(object):
         # Fan term
         # --------
 
-        # nmode, ntemp, nomegase, nkpt, nband
-        fan = zeros((nmode, ntemp, nomegase, nkpt, nband), dtype=complex)
-
-        # n + 1 - f
-        # nkpt, nband, nmode, ntemp
-        num1 = (einsum('ot,kn->knot', n_B, ones((nkpt,self.nband)))
-              + 1. - einsum('knt,o->knot', occ[0,:,:,:], ones(nmode)))
-
-        # n + f
-        # nkpt, nband, nmode, ntemp
-        num2 = (einsum('ot,kn->knot', n_B, ones((nkpt,self.nband)))
-              + einsum('knt,o->knot', occ[0,:,:,:], ones(nmode)))
+        # Emission (n + 1 - f) and absorption (n + f) numerators
+        # 2, nkpt, mband, nmode, ntemp
+        num = np.stack((n_B[None,None,:,:] + 1. - occ[0,:,:,None,:],
+                        n_B[None,None,:,:] + occ[0,:,:,None,:]))
+        num = self._astype_precision(num)
 
         # nkpt, nband
         #eta = (2 * occ0 - 1) * self.smearing * 1j
 
         # nkpt, nband, nomegase
-        eta = self.get_eta(omega_se)
+        eta = self.get_eta(omega_se)[:,ib:fb,:]
 
-        for jband in range(self.nband):
+        # All the bands m at k+q are treated at once.
+        # The temperature dimension only enters through the numerators,
+        # so it is contracted last, together with the sum over m.
 
-            # nkpt, nband
-            delta_E = (
-                self.eig0.EIG[0,:,:].real
-              - einsum('k,n->kn', self.eigq.EIG[0,:,jband].real, ones(nband))
-              )
-    
-            # nkpt, nband, nomegase
+        # nkpt, nband
+        # nkpt, mband
+        eig0, eigq = self.get_eig_real()
+        eig0 = eig0[:,ib:fb]
+        mband = eigq.shape[-1]
+
+        fan_g2 = self._astype_precision(fan_g2)
+
+        # The mode indices are summed in the contraction in case mode=False
+        # nmode, ntemp, nomegase, nkpt, nband
+        fan = np.empty((nmode if mode else 1, ntemp, nomegase, nkpt, nband),
+                       dtype=complex)
+
+        # The denominators only exist for a block of k-points at a time
+        for ks in self.get_kpt_blocks(2 * nband * mband * nomegase * nmode):
+
+            if real:
+                fan[:,:,:,ks,:] = self.get_fan_active_real(
+                    fan_g2[ks], num[:,ks], eig0[ks], eigq[ks], omega_se,
+                    eta[ks], omega_q, mode=mode)
+                continue
+
+            # nkpt, nband, mband, nomegase
             delta_E_omega = (
-                  einsum('kn,l->knl', delta_E, ones(nomegase))
-                + einsum('kn,l->knl', ones((nkpt,nband)), omega_se)
-                - eta
+                  eig0[ks,:,None,None]
+                - eigq[ks,None,:,None]
+                + omega_se[None,None,None,:]
+                - eta[ks,:,None,:]
                 )
-    
-            # Emission term
-            # nkpt, nband, nomegase, nmode
-            deno1 = (einsum('knl,o->knlo', delta_E_omega, ones(nmode))
-                   - einsum('knl,o->knlo', ones((nkpt,nband,nomegase)), omega_q))
 
-            # nmode, nkpt, nband, nomegase, ntemp
-            div1 = einsum('kot,knlo->oknlt', num1[:,jband,:,:], 1.0 / deno1)
-    
-            del deno1
-    
-            # Absorption term
-            # nkpt, nband, nomegase, nmode
-            deno2 = (einsum('knl,o->knlo', delta_E_omega, ones(nmode))
-                   + einsum('knl,o->knlo', ones((nkpt,nband,nomegase)), omega_q))
-    
-            # nmode, nkpt, nband, nomegase, ntemp
-            div2 = einsum('kot,knlo->oknlt', num2[:,jband,:,:], 1.0 / deno2)
+            # Emission and absorption denominators
+            # 2, nkpt, nband, mband, nomegase, nmode
+            deno = np.empty((2,) + delta_E_omega.shape + (nmode,),
+                            dtype=self.complex_dtype)
+            deno[0] = delta_E_omega[...,None] - omega_q
+            deno[1] = delta_E_omega[...,None] + omega_q
 
-            del deno2
-    
-            # FIXME This is not optimal: The mode indices will be summed
-            #       so there is no need to create an array this big.
-            # in case omega=True and mode=False
+            del delta_E_omega
 
-            # nmode, ntemp, nomegase, nkpt, nband
-            fan += einsum('kno,oknlt->otlkn', fan_g2[:,:,jband,:], div1 + div2)
-    
-            del div1, div2
+            # Invert the denominators in place
+            np.reciprocal(deno, out=deno)
+
+            # Both terms are summed in a single contraction
+            fan[:,:,:,ks,:] = self.contract_fan_numerators(
+                fan_g2[ks], num[:,ks], deno, mode=mode)
+
+            del deno
       
         # Reduce the arrays
         fan = self.reduce_array(fan, mode=mode, temperature=temperature,
@@ -620,8 +864,54 @@ class QptAnalyzer(object):
 
         return fan, ddw
 
+    def get_fan_active_real(self, g2, num, eig0, eigq, omega_se, eta,
+                            omega_q, mode=True):
+        """
+        Compute the real part of the active Fan term for a block of k-points
+        using real arithmetic only. With deno = r + i c, where c does not
+        depend on the band at k+q nor on the mode, 1/deno = (r - i c) / |deno|^2.
+
+        Returns: fan[nmode, ntemp, nomegase, nkpt, nband]
+        """
+        nmode = omega_q.shape[0]
+
+        # nkpt, nband, mband, nomegase
+        delta_E_omega = (eig0[:,:,None,None] - eigq[:,None,:,None]
+                         + omega_se[None,None,None,:])
+
+        # Real part of the emission and absorption denominators
+        # 2, nkpt, nband, mband, nomegase, nmode
+        reinv = np.empty((2,) + delta_E_omega.shape + (nmode,),
+                         dtype=self.real_dtype)
+        reinv[0] = delta_E_omega[...,None] - omega_q
+        reinv[1] = delta_E_omega[...,None] + omega_q
+
+        del delta_E_omega
+
+        # Imaginary part of the denominators
+        # nkpt, nband, 1, nomegase, 1
+        c = - eta.imag[:,:,None,:,None]
+
+        # 1 / |deno|^2
+        inv2 = np.square(reinv)
+        inv2 += c ** 2
+        np.reciprocal(inv2, out=inv2)
+
+        # Re(1/deno)
+        reinv *= inv2
+
+        fan = self.contract_fan_numerators(g2.real, num, reinv, mode=mode)
+
+        if np.iscomplexobj(g2):
+            # Im(1/deno)
+            inv2 *= -c
+            fan -= self.contract_fan_numerators(g2.imag, num, inv2,
+                                                mode=mode)
+
+        return fan
+
     def get_fan_ddw(self, mode=False, temperature=False,
-                    omega=False, dynamical=False, shape=None):
+                    omega=False, dynamical=False, shape=None, real=False):
         """
         Compute the sum of the Fan and the Diagonal Debye-Waller term.
 
@@ -637,6 +927,8 @@ class QptAnalyzer(object):
         dynamical:
             Use the full dynamical theory by including the phonon frequencies
             in the location of the poles of the self-energy.
+        real:
+            Only the real part of the active Fan term is computed.
 
         """
 
@@ -649,7 +941,7 @@ class QptAnalyzer(object):
 
         fan_stern, ddw_stern = self.get_fan_ddw_sternheimer(**kwargs)
         fan_active, ddw_active = self.get_fan_ddw_active(dynamical=dynamical,
-                                                         **kwargs)
+                                                         real=real, **kwargs)
 
         fan = fan_active + fan_stern
         ddw = ddw_active + ddw_stern
@@ -713,20 +1005,25 @@ class QptAnalyzer(object):
             fan, ddw = self.get_fan_ddw_sternheimer(**kwargs)
 
         elif only_active:
-            fan, ddw = self.get_fan_ddw_active(dynamical=dynamical, **kwargs)
+            fan, ddw = self.get_fan_ddw_active(dynamical=dynamical, real=real,
+                                               **kwargs)
 
         else:
-            fan, ddw = self.get_fan_ddw(dynamical=dynamical, **kwargs)
+            fan, ddw = self.get_fan_ddw(dynamical=dynamical, real=real,
+                                        **kwargs)
 
+        # The arrays returned above are new, so they are modified in place
         if only_fan:
-            se_q = fan
+            se = fan
         elif only_ddw:
-            se_q = - ddw
+            se = np.negative(ddw, out=ddw)
         else:
-            se_q = fan - ddw
+            se = fan
+            se -= ddw
 
-        se = self.wtq * se_q
-        se = self.eig0.make_average(se)
+        se *= self.wtq
+        se = self.eig0.make_average(
+            se, bands=slice(self.iband_se, self.iband_se + self.nband_se))
 
         if real:
             se = se.real
@@ -737,8 +1034,7 @@ class QptAnalyzer(object):
         if shape is not None:
             initial_indices = self.get_se_indices(
                 mode=mode, temperature=temperature, omega=omega)
-            summation = initial_indices + '->' + shape
-            se = einsum(summation, se)
+            se = self.sum_transpose(se, initial_indices, shape)
 
         return se
 
@@ -762,7 +1058,7 @@ class QptAnalyzer(object):
 
             # Bose-Enstein occupation number
             # nmode, ntemp
-            n_B = self.ddb.get_bose(temperatures)
+            n_B = self.get_bose(temperatures)
 
         else:
             ntemp = 1
@@ -795,57 +1091,56 @@ class QptAnalyzer(object):
         # nkpt, nband, nband, nmode
         fan_g2, ddw_g2 = self.get_fan_ddw_gkk2_active()
       
-        # nmode, ntemp, nkpt
-        n_B = einsum('ot,q->otq', n_B, ones(nkpt))
-
-        # nmode, ntemp, nkpt,nband
-        f = einsum('qmt,o->otqm', f, ones(nmode))
-
         # nkpt, nband
         sign = np.sign(- (2 * occ0 - 1.))
 
-        broadening = zeros((nmode,ntemp,nomegase,nkpt,nband))
+        # nkpt, nband
+        # nkpt, mband
+        eig0, eigq = self.get_eig_real()
+        eig0 = eig0[:,ib:fb]
 
-        for jband in range(self.nband):
+        # Numerators (n + f) and (n + 1 - f)
+        # 2, nkpt, mband, nmode, ntemp
+        num = np.stack((n_B[None,None,:,:] + f[:,:,None,:],
+                        n_B[None,None,:,:] + 1 - f[:,:,None,:]))
 
-            # nmode, ntemp, nkpt
-            num1 = (n_B + f[...,jband])
-            num2 = (n_B + 1 - f[...,jband])
+        # The numerators and the deltas are real, so only the real part
+        # of the squared matrix elements contributes to the broadening.
+        # nkpt, nband, mband, nmode
+        fan_g2 = fan_g2.real * sign[:,:,None,None]
 
-            # nkpt, nband
-            delta_E = (
-                self.eig0.EIG[0,:,ib:fb].real
-                - einsum('q,n->qn', self.eigq.EIG[0,:,jband].real, ones(nband))
-                )
+        mband = eigq.shape[-1]
+        eta = self.smearing
 
-            # nkpt, nband, nomegase
-            delta_E_omega = (einsum('kn,l->knl', delta_E, ones(nomegase))
-                           + einsum('kn,l->knl', ones((nkpt,nband)), omega_se))
+        # nmode, ntemp, nomegase, nkpt, nband
+        broadening = np.empty((nmode if mode else 1, ntemp, nomegase,
+                               nkpt, nband))
 
-            # nmode, nkpt, nband, nomegase
-            deno1 = (
-                einsum('knl,o->oknl', delta_E_omega, ones(nmode))
-              + einsum('o,knl->oknl', omega_q, ones((nkpt,nband,nomegase)))
-                )
+        # All the bands m at k+q are treated at once,
+        # for a block of k-points at a time.
+        for ks in self.get_kpt_blocks(2 * nband * mband * nomegase * nmode):
 
-            # nmode, nkpt, nband, nomegase
-            deno2 = (
-                einsum('knl,o->oknl', delta_E_omega, ones(nmode))
-              - einsum('o,knl->oknl', omega_q, ones((nkpt,nband,nomegase)))
-                )
+            # nkpt, nband, mband, nomegase
+            delta_E_omega = (eig0[ks,:,None,None] - eigq[ks,None,:,None]
+                             + omega_se[None,None,None,:])
 
-            # nmode, nkpt, nband, nomegase
-            delta1 = np.pi * delta_lorentzian(deno1, self.smearing)
-            delta2 = np.pi * delta_lorentzian(deno2, self.smearing)
-    
-            # nmode, ntemp, nomegase, nkpt, nband
-            term1 = einsum('otk,oknl->otlkn', num1, delta1)
-            term2 = einsum('otk,oknl->otlkn', num2, delta2)
+            # 2, nkpt, nband, mband, nomegase, nmode
+            deltas = np.empty((2,) + delta_E_omega.shape + (nmode,))
+            deltas[0] = delta_E_omega[...,None] + omega_q
+            deltas[1] = delta_E_omega[...,None] - omega_q
+
+            del delta_E_omega
 
-            deltas = einsum('kn,otlkn->otlkn', sign, term1 + term2)
-            broadening_j = einsum('kno,otlkn->otlkn', fan_g2[:,:,jband,:], deltas)
+            # pi * delta_lorentzian(deltas, self.smearing), in place
+            np.square(deltas, out=deltas)
+            deltas += eta ** 2
+            np.reciprocal(deltas, out=deltas)
+            deltas *= eta
 
-            broadening += broadening_j.real
+            broadening[:,:,:,ks,:] = self.contract_fan_numerators(
+                fan_g2[ks], num[:,ks], deltas, mode=mode)
+
+            del deltas
 
         # Reduce the arrays
         broadening = self.reduce_array(broadening, mode=mode,
@@ -853,14 +1148,14 @@ class QptAnalyzer(object):
                                        omega=omega)
 
         broadening *= self.wtq
-        broadening = self.eig0.make_average(broadening)
+        broadening = self.eig0.make_average(broadening, bands=slice(ib, fb))
 
         # Note that we must not reshape before calling eig0.make_average
         if shape is not None:
             initial_indices = self.get_se_indices(
                 mode=mode, temperature=temperature, omega=omega)
-            summation = initial_indices + '->' + shape
-            broadening = einsum(summation, broadening)
+            broadening = self.sum_transpose(broadening, initial_indices,
+                                            shape)
 
         return broadening
 
@@ -1279,31 +1574,28 @@ class QptAnalyzer(object):
         in a static scheme from the EIGI2D files.
         """
     
-        nkpt = self.nkpt
-        nband = self.nband
-        natom = self.natom
-        ntemp = self.ntemp
-          
-        # These indicies be swapped at the end
-        self.tdb = zeros((ntemp, nkpt, nband), dtype=complex)
-    
         # Get reduced displacement (scaled with frequency)
         displ_red_FAN2, displ_red_DDW2 = self.ddb.get_reduced_displ_squared()
     
-        bose = self.ddb.get_bose(self.temperatures)
-    
-        fan_corrQ = einsum('ijklmn,olnkm->oij', self.eigi2d.EIG2D, displ_red_FAN2)
-    
-        for imode in np.arange(3*natom):
-          for tt, T in enumerate(self.temperatures):
-            self.tdb[tt,:,:] += np.pi * fan_corrQ[imode,:,:] * (2*bose[imode,tt] + 1.)
+        bose = self.get_bose(self.temperatures)
     
-        self.tdb = self.tdb * self.wtq
+        # The temperature factor is applied to the displacements
+        # so that the sum over modes is done in the same contraction.
+        # ntemp, natom, natom, 3, 3
+        displ_red_FAN2_T = np.tensordot(2 * bose + 1., displ_red_FAN2,
+                                        axes=([0],[0]))
+        displ_red_FAN2_T = self._astype_precision(displ_red_FAN2_T)
+
+        # The output is written directly in its final layout
+        # nkpt, nband, ntemp
+        self.tdb = np.asarray(self.contract_eig2d_displ(self.eigi2d.EIG2D,
+                                                        displ_red_FAN2_T),
+                              dtype=complex)
     
-        self.tdb = self.eig0.make_average(self.tdb)
+        self.tdb *= np.pi * self.wtq
     
-        # nkpt, nband, ntemp
-        self.tdb = np.einsum('tkn->knt', self.tdb)
+        # The average is taken in place, on a (ntemp, nkpt, nband) view
+        self.eig0.make_average(self.tdb.transpose(2,0,1))
 
         return self.tdb
 
@@ -1313,22 +1605,25 @@ class QptAnalyzer(object):
         from the EIGI2D files.
         """
     
-        nkpt = self.nkpt
-        nband = self.nband
-        natom = self.natom
-    
-        self.zpb = zeros((nkpt, nband), dtype=complex)
-    
         # Get reduced displacement (scaled with frequency)
         displ_red_FAN2, displ_red_DDW2 = self.ddb.get_reduced_displ_squared()
         
-        fan_corrQ = einsum('ijklmn,olnkm->oij', self.eigi2d.EIG2D, displ_red_FAN2)
+        # The sum over modes is done on the displacements
+        # nkpt, nband, 1
+        fan_corrQ = self.contract_eig2d_displ(
+            self.eigi2d.EIG2D, self._astype_precision(
+                displ_red_FAN2.sum(axis=0, keepdims=True)))
+        fan_corrQ = np.asarray(fan_corrQ, dtype=complex)
     
-        self.zpb += np.pi * np.sum(fan_corrQ, axis=0)
-        self.zpb = self.zpb * self.wtq
+        self.zpb = fan_corrQ[...,0]
+        self.zpb *= np.pi * self.wtq
     
-        if np.any(self.zpb[:,:].imag > tol12):
-          warnings.warn("The real part of the broadening is non zero: {}".format(broadening))
+        # The rounding errors scale with the working precision
+        tol = max(tol12,
+                  np.finfo(self.real_dtype).eps * np.abs(self.zpb).max())
+        if np.any(np.abs(self.zpb.imag) > tol):
+          warnings.warn("The imaginary part of the broadening is non zero: {}"
+                        .format(self.zpb))
     
         self.zpb = self.eig0.make_average(self.zpb)
     
@@ -1383,7 +1678,7 @@ class QptAnalyzer(object):
             only_fan=True,
             )
         # nkpt, nband, nomegase, nband
-        self.zpaf = einsum('lkn->knl', self.zpaf) # FIXME why??
+        self.zpaf = self.zpaf.transpose(1,2,0) # FIXME why??
 
         return self.zpaf
 
@@ -152,6 +152,13 @@ def compute(
         The atomic masses, in amu.
         Will be read from the files if not specified.
 
+    precision: ('double')
+        Floating point precision of the largest arrays
+        in the active space contribution and of the second-order
+        eigenvalue derivatives, either 'double' or 'single'.
+        Single precision halves the memory and bandwidth needed,
+        at the cost of accuracy.
+
     Film names
     ----------
 
@@ -42,7 +42,8 @@ class SETest(EPCTest):
         new_kwargs.update(**kwargs)
         return new_kwargs
 
-    def run_compare_nc(self, function, key, refdir=None, nc_ref=None):
+    def run_compare_nc(self, function, key, refdir=None, nc_ref=None,
+                       **kwargs):
         """
         Run 'compute' by generating the arguments with 'function'
         then compare the array 'key' in nc_output.
@@ -57,6 +58,8 @@ class SETest(EPCTest):
         nc_ref:
             name of the netcdf file for comparison.
             Alternate argument of refdir.
+        kwargs:
+            Tolerance arguments passed to AssertClose.
         """
 
         out = compute(**function(self.tmpdir))
@@ -67,7 +70,7 @@ class SETest(EPCTest):
             nc_ref = out.nc_output.replace(self.tmpdir, refdir)
 
         self.check_reference_exists(nc_ref)
-        self.AssertClose(out.nc_output, nc_ref, key)
+        self.AssertClose(out.nc_output, nc_ref, key, **kwargs)
 
     def generate_ref(self, function):
         """
@@ -109,6 +112,15 @@ class SETest(EPCTest):
             self_energy=True,
             )
 
+    def get_zp_se_single(self, dirname):
+        return self.get_kwargs(
+            dirname,
+            basename='zp_se',
+            temperature=False,
+            self_energy=True,
+            precision='single',
+            )
+
     def get_td_se(self, dirname):
         return self.get_kwargs(
             dirname,
@@ -190,6 +202,17 @@ class SETest(EPCTest):
             split_active=False,
             )
 
+    def get_zpr_stat_nosplit_single(self, dirname):
+        return self.get_kwargs(
+            dirname,
+            basename='zpr_stat_nosplit',
+            temperature=False,
+            renormalization=True,
+            dynamical=False,
+            split_active=False,
+            precision='single',
+            )
+
     def get_tdr_stat_nosplit(self, dirname):
         return self.get_kwargs(
             dirname,
@@ -250,6 +273,17 @@ class SETest(EPCTest):
             split_active=False,
             )
 
+    def get_zpb_stat_nosplit_single(self, dirname):
+        return self.get_kwargs(
+            dirname,
+            basename='zpb_stat_nosplit',
+            temperature=False,
+            broadening=True,
+            dynamical=False,
+            split_active=False,
+            precision='single',
+            )
+
     def get_tdb_stat_nosplit(self, dirname):
         return self.get_kwargs(
             dirname,
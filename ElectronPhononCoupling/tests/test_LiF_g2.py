@@ -1,10 +1,69 @@
 from os.path import join as pjoin
 from copy import copy
+from contextlib import contextmanager
+
+import numpy as np
+from numpy.testing import assert_allclose
+import netCDF4 as nc
 
 from . import EPCTest, SETest
+from ..core.constants import Ha2eV
+from ..core.eigfile import EigFile
+from ..core.eigr2dfile import Eigr2dFile
+from ..core.gkkfile import GkkFile
+from ..core.qptanalyzer import QptAnalyzer
+from ..interface import compute
 from ..data import LiF_g2 as test
 
 
+@contextmanager
+def kpt_blocks(nrep, max_block_size):
+    """
+    Repeat the single k-point of the data nrep times when reading files,
+    and set QptAnalyzer.max_block_size, so that the k-points are treated
+    in several blocks. Yields the list of k-point slices used.
+    """
+    # Attributes holding a k-point dimension, with the axis of that dimension
+    kpt_axes = {
+        EigFile: dict(EIG=1, Kptns=0),
+        Eigr2dFile: dict(EIG2D=0, occ=1, eigenvalues=1, kpt=0),
+        GkkFile: dict(GKK=0, occ=1, eigenvalues=1, kpt=0),
+        }
+
+    read_nc = dict((cls, cls.read_nc) for cls in kpt_axes)
+    get_kpt_blocks = QptAnalyzer.get_kpt_blocks
+    default_block_size = QptAnalyzer.max_block_size
+
+    def tiled_read_nc(cls):
+        def wrapper(self, *args, **kwargs):
+            read_nc[cls](self, *args, **kwargs)
+            for name, axis in kpt_axes[cls].items():
+                setattr(self, name,
+                        np.repeat(getattr(self, name), nrep, axis=axis))
+            if 'nkpt' in self.__dict__:
+                self.nkpt *= nrep
+        return wrapper
+
+    slices = list()
+
+    def recorded_kpt_blocks(self, size_per_kpt):
+        for ks in get_kpt_blocks(self, size_per_kpt):
+            slices.append(ks)
+            yield ks
+
+    try:
+        for cls in kpt_axes:
+            cls.read_nc = tiled_read_nc(cls)
+        QptAnalyzer.get_kpt_blocks = recorded_kpt_blocks
+        QptAnalyzer.max_block_size = max_block_size
+        yield slices
+    finally:
+        for cls in kpt_axes:
+            cls.read_nc = read_nc[cls]
+        QptAnalyzer.get_kpt_blocks = get_kpt_blocks
+        QptAnalyzer.max_block_size = default_block_size
+
+
 # FIXME
 class Test_LiF_g2(SETest):
 
@@ -54,6 +113,136 @@ class Test_LiF_g2(SETest):
             key = 'self_energy',
             )
 
+    def run_compare_kpt_blocks(self, function, key, size_per_kpt):
+        """
+        Run 'compute' with the k-point repeated 5 times and treated
+        in blocks of 2, 2 and 1 k-points, then compare the array 'key'
+        at every k-point with the reference nc_output.
+
+        size_per_kpt:
+            Number of elements per k-point of the blocked arrays.
+        """
+        kwargs = function(self.tmpdir)
+        kwargs.update(write=False)
+
+        with kpt_blocks(5, 2 * size_per_kpt) as slices:
+            out = compute(**kwargs)
+
+        self.assertEqual(sorted(set((ks.start, ks.stop) for ks in slices)),
+                         [(0, 2), (2, 4), (4, 5)])
+
+        nc_ref = out.nc_output.replace(self.tmpdir, self.refdir)
+        self.check_reference_exists(nc_ref)
+
+        with nc.Dataset(nc_ref, 'r') as ds:
+            ref = ds.variables[key]
+            if ref.dimensions[-1] == 'cplex':
+                ref = ref[0,...,0] + 1j * ref[0,...,1]
+            else:
+                ref = ref[0,...]
+
+        arr = getattr(out, key)
+        self.assertEqual(arr.shape[0], 5)
+
+        # The reference has a single k-point
+        assert_allclose(arr, np.broadcast_to(ref, arr.shape), rtol=1e-5)
+
+    def run_compare_band_window(self, function, key, iband_se, nband_se):
+        """
+        Run 'compute' for the bands iband_se to iband_se + nband_se only,
+        then compare the array 'key' with the same bands
+        of the reference nc_output, computed with all bands.
+        """
+        kwargs = function(self.tmpdir)
+        kwargs.update(write=False, iband_se=iband_se, nband_se=nband_se)
+
+        out = compute(**kwargs)
+
+        nc_ref = out.nc_output.replace(self.tmpdir, self.refdir)
+        self.check_reference_exists(nc_ref)
+
+        with nc.Dataset(nc_ref, 'r') as ds:
+            ref = ds.variables[key]
+            if ref.dimensions[-1] == 'cplex':
+                ref = ref[0,...,0] + 1j * ref[0,...,1]
+            else:
+                ref = ref[0,...]
+
+        arr = getattr(out, key)
+        self.assertEqual(arr.shape[1], nband_se)
+
+        assert_allclose(arr, ref[:,iband_se:iband_se+nband_se,...], rtol=1e-5)
+
+    def test_zp_se_band_window(self):
+        """Zero Point Self-Energy for a window of bands"""
+        for iband_se, nband_se in ((1, 4), (4, 4)):
+            self.run_compare_band_window(
+                function = self.get_zp_se,
+                key = 'self_energy',
+                iband_se = iband_se,
+                nband_se = nband_se,
+                )
+
+    def test_tdr_dyn_band_window(self):
+        """Dynamical Tdep Ren for a window of bands"""
+        for iband_se, nband_se in ((1, 4), (4, 4)):
+            self.run_compare_band_window(
+                function = self.get_tdr_dyn,
+                key = 'temperature_dependent_renormalization',
+                iband_se = iband_se,
+                nband_se = nband_se,
+                )
+
+    def test_make_average_band_window(self):
+        """Degenerate states split by the band window are rejected"""
+        eig0 = EigFile(test.fnames['eigk_fname'], read=False)
+        eig0.read_nc()
+
+        # Bands 1 to 3 are degenerate
+        arr = np.arange(8, dtype=float).reshape(1, 8)
+        full = eig0.make_average(arr.copy())
+        window = eig0.make_average(arr[:,1:5].copy(), bands=slice(1, 5))
+        assert_allclose(window, full[:,1:5])
+
+        with self.assertRaises(ValueError):
+            eig0.make_average(arr[:,2:6].copy(), bands=slice(2, 6))
+
+    def test_zp_se_kpt_blocks(self):
+        """Zero Point Self-Energy computed in several blocks of k-points"""
+        # 2 * nband * mband * nomegase * nmode
+        self.run_compare_kpt_blocks(
+            function = self.get_zp_se,
+            key = 'self_energy',
+            size_per_kpt = 2 * 8 * 8 * 200 * 6,
+            )
+
+    def test_tdr_dyn_kpt_blocks(self):
+        """Dynamical Tdep Ren computed in several blocks of k-points"""
+        # 2 * nband * mband * nomegase * nmode
+        self.run_compare_kpt_blocks(
+            function = self.get_tdr_dyn,
+            key = 'temperature_dependent_renormalization',
+            size_per_kpt = 2 * 8 * 8 * 1 * 6,
+            )
+
+    def test_zp_se_single(self):
+        """Zero Point Self-Energy in single precision"""
+        self.run_compare_nc(
+            function = self.get_zp_se_single,
+            key = 'self_energy',
+            atol = 1e-4 / Ha2eV,
+            )
+
+    def test_precision_invalid(self):
+        """Unknown precision values are rejected"""
+        kwargs = self.get_zp_se_single(self.tmpdir)
+        for precision in ('Single', 'float32'):
+            kwargs.update(precision=precision)
+            with self.assertRaises(ValueError):
+                compute(**kwargs)
+            with self.assertRaises(ValueError):
+                QptAnalyzer(precision=precision)
+
     def test_zp_sf(self):
         """Zero Point Spectral Function"""
         self.run_compare_nc(
@@ -96,6 +285,14 @@ class Test_LiF_g2(SETest):
             key = 'zero_point_renormalization',
             )
 
+    def test_zpr_stat_nosplit_single(self):
+        """Static Zero Point Renormalization in single precision"""
+        self.run_compare_nc(
+            function = self.get_zpr_stat_nosplit_single,
+            key = 'zero_point_renormalization',
+            atol = 1e-4 / Ha2eV,
+            )
+
     def test_tdr_static_nosplit(self):
         """Static Temperature Dependent Renormalization"""
         self.run_compare_nc(
@@ -110,6 +307,14 @@ class Test_LiF_g2(SETest):
             key = 'zero_point_broadening',
             )
 
+    def test_zpb_stat_nosplit_single(self):
+        """Static Zero Point Broadening in single precision"""
+        self.run_compare_nc(
+            function = self.get_zpb_stat_nosplit_single,
+            key = 'zero_point_broadening',
+            atol = 1e-4 / Ha2eV,
+            )
+
     def test_tdb_stat_nosplit(self):
         """Static Temperature Dependent Broadening"""
         self.run_compare_nc(